@@ -1,7 +1,9 @@
 import json
-from openai import OpenAI
+import os
+from functools import lru_cache
 
-client = OpenAI()
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.json")
+MODEL_NAME = "gpt-4.1-mini"
 
 # اقرأ transcript من ملف (مؤقتًا هنحطه يدوي)
 transcript_text = """
@@ -10,11 +12,27 @@ Doctor: Does the pain get worse with exertion?
 Patient: Yes, especially when walking.
 """
 
-system_prompt = f"""
+
+# client + schema are created on first use, not at import
+@lru_cache(maxsize=1)
+def get_client():
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+@lru_cache(maxsize=1)
+def load_schema() -> str:
+    with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def build_system_prompt() -> str:
+    return f"""
 You are a medical clinical assistant.
 Given the following transcript, generate a JSON output strictly following this schema:
 
-{open("schema.json", "r", encoding="utf-8").read()}
+{load_schema()}
 
 Rules:
 - Output must be valid JSON only.
@@ -22,24 +40,33 @@ Rules:
 - Fill as much as possible based on the transcript.
 """
 
-response = client.chat.completions.create(
-    model="gpt-4.1-mini",
-    messages=[
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": transcript_text}
-    ],
-    temperature=0.2
-)
-
-raw_output = response.choices[0].message.content
-
-print("===== RAW AI OUTPUT =====")
-print(raw_output)
-
-# حاول نعمل parse للـ JSON
-try:
-    data = json.loads(raw_output)
-    print("\n===== PARSED JSON OK =====")
-    print(json.dumps(data, indent=2))
-except Exception as e:
-    print("\nJSON PARSE ERROR:", e)
\ No newline at end of file
+
+def analyze(transcript: str) -> str:
+    response = get_client().chat.completions.create(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": build_system_prompt()},
+            {"role": "user", "content": transcript}
+        ],
+        temperature=0.2
+    )
+    return response.choices[0].message.content
+
+
+def main():
+    raw_output = analyze(transcript_text)
+
+    print("===== RAW AI OUTPUT =====")
+    print(raw_output)
+
+    # حاول نعمل parse للـ JSON
+    try:
+        data = json.loads(raw_output)
+        print("\n===== PARSED JSON OK =====")
+        print(json.dumps(data, indent=2))
+    except Exception as e:
+        print("\nJSON PARSE ERROR:", e)
+
+
+if __name__ == "__main__":
+    main()
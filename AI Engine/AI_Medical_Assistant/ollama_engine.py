@@ -1,11 +1,23 @@
 import json
-import requests
+import os
+import sys
 import re
 from typing import Any, Dict
 
+# record/playback of Ollama calls lives with the backend (optional: live mode works without it).
+# appended, not prepended, so backend modules never shadow ours (e.g. backend/main.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend"))
+try:
+    import llm_cassette
+except ImportError:
+    llm_cassette = None
+
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "qwen2.5:3b"
 
+# None = live Ollama (see backend/llm_cassette.py)
+CASSETTE = llm_cassette.from_env() if llm_cassette is not None else None
+
 SYSTEM_PROMPT = """
 You are a medical AI assistant.
 You must return ONLY valid JSON and nothing else.
@@ -54,6 +66,13 @@ Rules:
 """
 
 def call_ollama(prompt: str) -> str:
+    if CASSETTE is not None:
+        return CASSETTE.generate_sync(MODEL_NAME, prompt, lambda: _call_ollama(prompt), system=SYSTEM_PROMPT)
+    return _call_ollama(prompt)
+
+def _call_ollama(prompt: str) -> str:
+    import requests  # only needed for live calls (not for cassette playback)
+
     payload = {
         "model": MODEL_NAME,
         "prompt": prompt,
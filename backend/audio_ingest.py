@@ -0,0 +1,349 @@
+"""
+Audio upload ingestion for /analyze-audio.
+
+- parses the multipart body straight from the request stream (no full buffering)
+- enforces size limits as bytes arrive, and duration limits from the WAV header when possible
+- spools to memory, rolling over to a temp file for large uploads (disk writes off the event loop)
+- hashes while streaming so duplicate uploads reuse the cached transcript
+- decodes + transcribes in a process pool so the event loop never blocks
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import struct
+import subprocess
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Union
+
+from starlette.requests import ClientDisconnect
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+    from python_multipart.exceptions import MultipartParseError
+except ImportError:  # pragma: no cover - older python-multipart
+    from multipart.multipart import MultipartParser, parse_options_header
+    from multipart.exceptions import MultipartParseError
+
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+MAX_DURATION_S = 15 * 60
+SPOOL_MAX_BYTES = 2 * 1024 * 1024
+WAV_HEADER_PEEK = 4096
+SAMPLE_RATE = 16000
+FILE_FIELD = "file"
+
+AUDIO_WORKERS = int(os.environ.get("AUDIO_WORKERS") or 1)
+# WHISPER_WARMUP=0 skips loading whisper when workers start (e.g. boxes without whisper)
+WHISPER_WARMUP = os.environ.get("WHISPER_WARMUP", "1") != "0"
+TRANSCRIPT_CACHE_SIZE = 256
+
+
+class AudioRejected(Exception):
+    pass
+
+
+# =======================
+# Spool
+# =======================
+class AudioSpool:
+    """
+    Memory buffer up to SPOOL_MAX_BYTES, then a named temp file
+    (named so the decoding process can open it by path).
+    """
+
+    def __init__(self, max_memory: int = SPOOL_MAX_BYTES):
+        self.max_memory = max_memory
+        self.size = 0
+        self.path: Optional[str] = None
+        self._mem: List[bytes] = []
+        self._file = None
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self._file is None and self.size <= self.max_memory:
+            self._mem.append(data)
+            return
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(prefix="upload_", suffix=".audio", delete=False)
+            self.path = self._file.name
+            pending = b"".join(self._mem) + data
+            self._mem = []
+        else:
+            pending = data
+        await asyncio.to_thread(self._file.write, pending)
+
+    async def finish(self):
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+
+    def data(self) -> Optional[bytes]:
+        return None if self.path else b"".join(self._mem)
+
+    def cleanup(self):
+        self._mem = []
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+class IngestedAudio:
+    def __init__(self, filename: str, sha256: str, spool: AudioSpool, duration_s: Optional[float]):
+        self.filename = filename
+        self.sha256 = sha256
+        self.size = spool.size
+        self.duration_s = duration_s
+        self.spool = spool
+
+    def source(self) -> Union[str, bytes]:
+        return self.spool.path or self.spool.data()
+
+    def cleanup(self):
+        self.spool.cleanup()
+
+
+def wav_duration(head: bytes) -> Optional[float]:
+    """
+    Duration from a RIFF/WAVE header, None if not WAV or not determinable (streamed WAV).
+    """
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    pos, byte_rate = 12, 0
+    while pos + 8 <= len(head):
+        cid = head[pos:pos + 4]
+        (size,) = struct.unpack("<I", head[pos + 4:pos + 8])
+        body = pos + 8
+        if cid == b"fmt " and body + 12 <= len(head):
+            (byte_rate,) = struct.unpack("<I", head[body + 8:body + 12])
+        elif cid == b"data":
+            if not byte_rate or size in (0, 0xFFFFFFFF):
+                return None
+            return size / byte_rate
+        pos = body + size + (size & 1)
+    return None
+
+
+# =======================
+# Streaming multipart ingest
+# =======================
+async def ingest_request(request, max_bytes: Optional[int] = None, max_duration_s: Optional[float] = None) -> IngestedAudio:
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    max_duration_s = MAX_DURATION_S if max_duration_s is None else max_duration_s
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise AudioRejected(f"upload too large (max {max_bytes // (1024 * 1024)} MB)")
+
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise AudioRejected("expected multipart/form-data with a 'file' field")
+
+    spool = AudioSpool()
+    hasher = hashlib.sha256()
+    head = bytearray()
+    state = {
+        "header_field": b"",
+        "header_value": b"",
+        "disposition": b"",
+        "in_file": False,
+        "seen_file": False,
+        "file_complete": False,
+        "filename": "",
+    }
+    pending: List[bytes] = []
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_field"].lower() == b"content-disposition":
+            state["disposition"] = state["header_value"]
+        state["header_field"] = state["header_value"] = b""
+
+    def on_headers_finished():
+        _, opts = parse_options_header(state["disposition"])
+        state["in_file"] = opts.get(b"name") == FILE_FIELD.encode() and not state["seen_file"]
+        if state["in_file"]:
+            state["seen_file"] = True
+            state["filename"] = opts.get(b"filename", b"").decode("utf-8", "replace")
+
+    def on_part_data(data, start, end):
+        if state["in_file"]:
+            pending.append(bytes(data[start:end]))
+
+    def on_part_end():
+        if state["in_file"]:
+            state["file_complete"] = True
+        state["in_file"] = False
+        state["disposition"] = b""
+
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+
+    duration: Optional[float] = None
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise AudioRejected(f"malformed multipart body: {e}")
+            for piece in pending:
+                if spool.size + len(piece) > max_bytes:
+                    raise AudioRejected(f"upload too large (max {max_bytes // (1024 * 1024)} MB)")
+                hasher.update(piece)
+                if len(head) < WAV_HEADER_PEEK:
+                    head += piece[: WAV_HEADER_PEEK - len(head)]
+                    duration = wav_duration(bytes(head))
+                    if duration is not None and duration > max_duration_s:
+                        raise AudioRejected(f"audio too long (max {max_duration_s // 60} min)")
+                await spool.write(piece)
+            pending.clear()
+        parser.finalize()
+        await spool.finish()
+    except ClientDisconnect:
+        spool.cleanup()
+        raise AudioRejected("client disconnected during upload")
+    except BaseException:
+        spool.cleanup()
+        raise
+
+    if not state["seen_file"] or spool.size == 0:
+        spool.cleanup()
+        raise AudioRejected("no audio in 'file' field")
+    # finalize() doesn't validate: a body cut off before the closing boundary still "parses"
+    if not state["file_complete"]:
+        spool.cleanup()
+        raise AudioRejected("upload truncated (file part never ended)")
+
+    return IngestedAudio(state["filename"], hasher.hexdigest(), spool, duration)
+
+
+# =======================
+# Decode + transcribe (process pool)
+# =======================
+_pool: Optional[ProcessPoolExecutor] = None
+_transcripts: "OrderedDict[str, str]" = OrderedDict()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: don't fork the server's event loop / threads into workers
+        _pool = ProcessPoolExecutor(
+            max_workers=AUDIO_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(WHISPER_WARMUP,),
+        )
+    return _pool
+
+
+def _init_worker(warm: bool):
+    if not warm:
+        return
+    try:
+        import whisper_runner
+
+        whisper_runner.warm_up()
+    except Exception:
+        # e.g. whisper not installed: left for the first real request to report
+        # (an initializer that raises would break the whole pool)
+        pass
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def warm_up():
+    """
+    Start every pool worker now, in the background, so each one loads whisper
+    (see _init_worker) before the first upload instead of during it.
+    The pool spawns a new process for each submit while none is idle, so
+    AUDIO_WORKERS jobs submitted at once start AUDIO_WORKERS processes.
+    """
+    pool = get_pool()
+    for _ in range(AUDIO_WORKERS):
+        pool.submit(_worker_ready).add_done_callback(lambda f: f.exception())
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def decode_audio(src: Union[str, bytes], max_duration_s: float = MAX_DURATION_S):
+    """
+    ffmpeg -> 16 kHz mono float32 (what whisper expects). Stops decoding just past the limit.
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", src if isinstance(src, str) else "pipe:0",
+        "-t", str(max_duration_s + 1),
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-",
+    ]
+    out = subprocess.run(
+        cmd,
+        input=None if isinstance(src, str) else src,
+        capture_output=True,
+        check=True,
+    ).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def decode_and_transcribe(src: Union[str, bytes], max_duration_s: float = MAX_DURATION_S) -> dict:
+    """
+    Runs inside a pool worker; the whisper model stays loaded per worker.
+    """
+    import whisper_runner
+
+    audio = decode_audio(src, max_duration_s)
+    duration = len(audio) / SAMPLE_RATE
+    if duration > max_duration_s:
+        return {"text": "", "duration_s": duration, "too_long": True}
+    return {"text": whisper_runner.transcribe(audio), "duration_s": duration, "too_long": False}
+
+
+async def transcribe(audio: IngestedAudio, max_duration_s: float = MAX_DURATION_S) -> str:
+    cached = _transcripts.get(audio.sha256)
+    if cached is not None:
+        _transcripts.move_to_end(audio.sha256)
+        return cached
+
+    loop = asyncio.get_running_loop()
+    try:
+        res = await loop.run_in_executor(get_pool(), decode_and_transcribe, audio.source(), max_duration_s)
+    except BrokenProcessPool:
+        # a worker died (e.g. OOM in whisper): start a fresh pool and retry once
+        shutdown_pool()
+        res = await loop.run_in_executor(get_pool(), decode_and_transcribe, audio.source(), max_duration_s)
+    if res["too_long"]:
+        raise AudioRejected(f"audio too long (max {max_duration_s // 60} min)")
+
+    _transcripts[audio.sha256] = res["text"]
+    while len(_transcripts) > TRANSCRIPT_CACHE_SIZE:
+        _transcripts.popitem(last=False)
+    return res["text"]
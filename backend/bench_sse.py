@@ -0,0 +1,148 @@
+"""
+CPU cost of the SSE layer for many concurrent live-suggestion streams.
+
+Compares the previous per-request design (json.dumps + asyncio.Queue + pinger task
+per stream) with sse_stream (bytes encoding, shared heartbeat, coalesced writes).
+No HTTP and no LLM: each stream waits like a model would, then emits its events.
+
+Usage (from backend/):
+    python bench_sse.py                    # 1000 streams
+    python bench_sse.py --streams 5000 --duration 6
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import AsyncGenerator, List
+
+from sse_stream import CONNECTED_EVENT, DONE_EVENT, SSEHeartbeat, SSEStream
+
+QUESTIONS = ["السخونية قد ايه ووصلت كام؟", "الكحة ناشفة ولا ببلغم؟"]
+
+
+# =======================
+# Previous implementation (baseline)
+# =======================
+def legacy_sse(event: str, data_obj) -> str:
+    if isinstance(data_obj, str):
+        data = data_obj
+    else:
+        data = json.dumps(data_obj, ensure_ascii=False)
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def legacy_stream(delays: List[float]) -> AsyncGenerator[str, None]:
+    yield legacy_sse("ping", {"stage": "connected"})
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pinger():
+        try:
+            while True:
+                await asyncio.sleep(2)
+                await queue.put(("ping", {}))
+        except asyncio.CancelledError:
+            return
+
+    async def producer():
+        for d, q in zip(delays, QUESTIONS):
+            await asyncio.sleep(d)
+            await queue.put(("q", {"q": q, "language": "ar"}))
+        await queue.put(("done", {}))
+
+    ping_task = asyncio.create_task(pinger())
+    prod_task = asyncio.create_task(producer())
+    try:
+        while True:
+            ev, data = await queue.get()
+            yield legacy_sse(ev, data)
+            if ev in ("done", "error"):
+                break
+    finally:
+        ping_task.cancel()
+        prod_task.cancel()
+        for t in (ping_task, prod_task):
+            try:
+                await t
+            except BaseException:
+                pass
+
+
+# =======================
+# Current implementation
+# =======================
+async def current_stream(delays: List[float], heartbeat: SSEHeartbeat) -> AsyncGenerator[bytes, None]:
+    stream = SSEStream(heartbeat)
+    stream.push(CONNECTED_EVENT)
+
+    async def producer():
+        try:
+            for d, q in zip(delays, QUESTIONS):
+                await asyncio.sleep(d)
+                stream.send("q", {"q": q, "language": "ar"})
+            stream.push(DONE_EVENT)
+        finally:
+            stream.close()
+
+    prod_task = asyncio.create_task(producer())
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        stream.close()
+        prod_task.cancel()
+        try:
+            await prod_task
+        except BaseException:
+            pass
+
+
+# =======================
+# Driver
+# =======================
+async def _drain(gen) -> tuple:
+    writes = nbytes = 0
+    async for chunk in gen:
+        writes += 1
+        nbytes += len(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+    return writes, nbytes
+
+
+async def run_case(name: str, streams: int, duration: float, seed: int) -> dict:
+    rnd = random.Random(seed)
+    # first question somewhere in the window, second one shortly after (often same tick)
+    plans = [[rnd.uniform(0, duration), rnd.choice((0.0, 0.0, 0.05))] for _ in range(streams)]
+    heartbeat = SSEHeartbeat()
+
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    if name == "legacy":
+        results = await asyncio.gather(*(_drain(legacy_stream(p)) for p in plans))
+    else:
+        results = await asyncio.gather(*(_drain(current_stream(p, heartbeat)) for p in plans))
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+
+    return {
+        "impl": name,
+        "streams": streams,
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_1000_streams": round(cpu * 1000 * 1000 / streams, 1),
+        "wall_s": round(wall, 3),
+        "writes": sum(r[0] for r in results),
+        "bytes": sum(r[1] for r in results),
+    }
+
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Benchmark SSE streaming CPU per concurrent streams.")
+    ap.add_argument("--streams", type=int, default=1000)
+    ap.add_argument("--duration", type=float, default=5.0, help="spread of model latency per stream (seconds)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    for name in ("legacy", "current"):
+        r = asyncio.run(run_case(name, args.streams, args.duration, args.seed))
+        print(" | ".join(f"{k}={v}" for k, v in r.items()))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,185 @@
+"""
+Import-time / startup benchmark for the backend and AI Engine entry points.
+
+Each target is imported in a fresh interpreter with `python -X importtime`:
+- cold: empty bytecode cache (PYTHONPYCACHEPREFIX pointing at a new temp dir)
+- warm: same cache dir again, so .pyc files are reused
+
+Optionally (--whisper AUDIO) measures the whisper daemon: time to ready,
+first job and second job on a warm model.
+
+Usage (from backend/):
+    python bench_startup.py
+    python bench_startup.py --top 5 --json startup.json
+    python bench_startup.py --whisper ../sample.wav
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_ENGINE_DIR = os.path.join(BACKEND_DIR, "..", "AI Engine", "AI_Medical_Assistant")
+
+# (name, module, cwd)
+TARGETS = [
+    ("backend.main", "main", BACKEND_DIR),
+    ("backend.whisper_runner", "whisper_runner", BACKEND_DIR),
+    ("backend.audio_ingest", "audio_ingest", BACKEND_DIR),
+    ("ai_engine", "ai_engine", AI_ENGINE_DIR),
+    ("ollama_engine", "ollama_engine", AI_ENGINE_DIR),
+]
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    lines look like: "import time:      self [us] |  cumulative | imported package"
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()[1:]  # drop the separator space, keep nesting indent
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+def measure(module: str, cwd: str, pycache: str) -> Dict:
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    # otherwise the cold pass writes no .pyc and "warm" is just a second cold run
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    t0 = time.perf_counter()
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(p.stderr)
+    target = next((r for r in rows if r["module"] == module), None)
+    return {
+        "ok": p.returncode == 0,
+        "error": p.stderr.strip().splitlines()[-1] if p.returncode else "",
+        "wall_s": round(wall, 3),
+        "import_ms": round(target["cumulative_us"] / 1000, 1) if target else None,
+        "rows": rows,
+    }
+
+
+def top_imports(rows: List[Dict], module: str, n: int) -> List[str]:
+    """
+    Heaviest direct imports of `module` (importtime lists children before their parent).
+    """
+    children: List[Dict] = []
+    for r in rows:
+        if r["depth"] == 0:
+            if r["module"] == module:
+                break
+            children = []
+        elif r["depth"] == 1:
+            children.append(r)
+    else:
+        return []
+    tops = sorted(children, key=lambda r: r["cumulative_us"], reverse=True)
+    return [f"{r['module']} {r['cumulative_us'] / 1000:.1f}ms" for r in tops[:n]]
+
+
+def bench_imports(top: int) -> List[Dict]:
+    out = []
+    for name, module, cwd in TARGETS:
+        with tempfile.TemporaryDirectory(prefix="pycache_") as pycache:
+            cold = measure(module, cwd, pycache)
+            cache_written = any(files for _, _, files in os.walk(pycache))
+            warm = measure(module, cwd, pycache)
+        out.append({
+            "target": name,
+            "ok": warm["ok"],
+            "error": warm["error"],
+            "cache_written": cache_written,
+            "cold_wall_s": cold["wall_s"],
+            "cold_import_ms": cold["import_ms"],
+            "warm_wall_s": warm["wall_s"],
+            "warm_import_ms": warm["import_ms"],
+            "top_imports": top_imports(warm["rows"], module, top),
+        })
+    return out
+
+
+def bench_whisper_daemon(audio_path: str) -> Dict:
+    t0 = time.perf_counter()
+    p = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "whisper_runner.py"), "--daemon"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        ready = json.loads(p.stdout.readline() or "{}")
+        ready_s = time.perf_counter() - t0
+
+        def job(i: int) -> tuple:
+            t = time.perf_counter()
+            p.stdin.write(json.dumps({"id": i, "path": os.path.abspath(audio_path)}) + "\n")
+            p.stdin.flush()
+            res = json.loads(p.stdout.readline() or "{}")
+            return time.perf_counter() - t, res
+
+        first_s, first = job(1)
+        second_s, _ = job(2)
+    finally:
+        p.stdin.close()
+        p.wait(timeout=30)
+
+    return {
+        "ready": bool(ready.get("ready")),
+        "ready_s": round(ready_s, 3),
+        "first_job_s": round(first_s, 3),
+        "warm_job_s": round(second_s, 3),
+        "error": first.get("error", ""),
+    }
+
+
+def main_cli(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Cold/warm import-time benchmark for entry points.")
+    ap.add_argument("--top", type=int, default=3, help="heaviest direct imports to show per target")
+    ap.add_argument("--whisper", metavar="AUDIO", help="also benchmark whisper_runner --daemon on this file")
+    ap.add_argument("--json", dest="json_out", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    results = {"imports": bench_imports(args.top)}
+    for r in results["imports"]:
+        status = "" if r["ok"] else f" | FAILED: {r['error']}"
+        if not r["cache_written"]:
+            status += " | WARNING: cold pass wrote no bytecode, warm == cold"
+        print(
+            f"{r['target']}: cold {r['cold_wall_s']}s ({r['cold_import_ms']}ms import)"
+            f" | warm {r['warm_wall_s']}s ({r['warm_import_ms']}ms import){status}"
+        )
+        for t in r["top_imports"]:
+            print(f"    {t}")
+
+    if args.whisper:
+        results["whisper_daemon"] = bench_whisper_daemon(args.whisper)
+        print("whisper daemon:", " | ".join(f"{k}={v}" for k, v in results["whisper_daemon"].items()))
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,180 @@
+"""
+Record / playback for Ollama calls.
+
+record   -> call Ollama for real, save response + streamed token timing keyed by prompt hash
+playback -> never touch Ollama, replay saved responses at recorded speed (or faster)
+
+Enable with env vars (main.py and ollama_engine.py read them at import):
+    LLM_CASSETTE_MODE=record|playback   (unset/live = normal Ollama)
+    LLM_CASSETTE=path/to/cassette.json  (default: llm_cassette.json)
+    LLM_CASSETTE_SPEED=1.0              (playback speed, 0 = no delays)
+"""
+import hashlib
+import json
+import os
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_PATH = "llm_cassette.json"
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+class RecordedLLMError(RuntimeError):
+    """
+    Raised on playback where the live call failed while recording.
+    """
+
+
+def prompt_key(model: str, prompt: str, system: str = "", stream: bool = False, force_json: bool = False) -> str:
+    raw = json.dumps(
+        {"model": model, "prompt": prompt, "system": system, "stream": stream, "format": "json" if force_json else ""},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path: str = DEFAULT_PATH, mode: str = "playback", speed: float = 1.0):
+        if mode not in ("record", "playback"):
+            raise ValueError(f"unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.entries: Dict[str, dict] = {}
+        if mode == "playback" and not os.path.exists(path):
+            raise FileNotFoundError(f"cassette not found: {path} (record it first)")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    # -----------------------
+    # storage
+    # -----------------------
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": self.entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def _get(self, key: str, prompt: str) -> dict:
+        entry = self.entries.get(key)
+        if entry is None:
+            raise CassetteMiss(f"no recorded response for prompt {key[:12]} ({prompt[:60]!r}...)")
+        return entry
+
+    def _put(self, key: str, model: str, prompt: str, entry: dict, save: bool = True):
+        entry["model"] = model
+        entry["prompt_head"] = prompt[:120]
+        self.entries[key] = entry
+        if save:
+            self.save()
+
+    async def _sleep(self, seconds: float):
+        # asyncio imported here: the sync path (ollama_engine.py) shouldn't pay for it
+        import asyncio
+
+        if self.speed > 0 and seconds > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    # -----------------------
+    # async (backend/main.py)
+    # -----------------------
+    async def generate_full(
+        self,
+        model: str,
+        prompt: str,
+        live: Callable[[], Awaitable[str]],
+        force_json: bool = False,
+    ) -> str:
+        key = prompt_key(model, prompt, force_json=force_json)
+        if self.mode == "playback":
+            entry = self._get(key, prompt)
+            await self._sleep(entry.get("latency_s", 0.0))
+            return entry["response"]
+
+        t0 = time.perf_counter()
+        response = await live()
+        self._put(key, model, prompt, {"response": response, "latency_s": round(time.perf_counter() - t0, 4)})
+        return response
+
+    async def stream(
+        self,
+        model: str,
+        prompt: str,
+        live: Callable[[], AsyncGenerator[str, None]],
+    ) -> AsyncGenerator[str, None]:
+        key = prompt_key(model, prompt, stream=True)
+        if self.mode == "playback":
+            entry = self._get(key, prompt)
+            for delay, chunk in entry["chunks"]:
+                await self._sleep(delay)
+                yield chunk
+            if entry.get("error"):
+                raise RecordedLLMError(entry["error"])
+            return
+
+        # chunks are [seconds since previous chunk (or call start), text].
+        # The entry is live in memory from the first chunk: consumers stop reading
+        # once they have enough questions and the generator may only be closed later.
+        chunks: List[list] = []
+        entry = {"chunks": chunks}
+        previous = self.entries.get(key)
+        keep = False
+        last = time.perf_counter()
+        try:
+            async for chunk in live():
+                now = time.perf_counter()
+                chunks.append([round(now - last, 4), chunk])
+                last = now
+                if len(chunks) == 1:
+                    self._put(key, model, prompt, entry, save=False)
+                yield chunk
+            keep = True
+        except GeneratorExit:
+            # consumer stopped early (enough questions): a valid recording
+            keep = True
+            raise
+        except Exception as e:
+            # record the failure too, so playback fails the same way
+            entry["error"] = str(e)
+            self._put(key, model, prompt, entry, save=False)
+            keep = True
+            raise
+        finally:
+            if not keep:
+                # cancelled mid-stream: don't leave a truncated "clean" response behind
+                if previous is not None:
+                    self.entries[key] = previous
+                else:
+                    self.entries.pop(key, None)
+            if keep or chunks:
+                self.save()
+
+    # -----------------------
+    # sync (AI Engine/ollama_engine.py)
+    # -----------------------
+    def generate_sync(self, model: str, prompt: str, live: Callable[[], str], system: str = "") -> str:
+        key = prompt_key(model, prompt, system=system)
+        if self.mode == "playback":
+            entry = self._get(key, prompt)
+            if self.speed > 0:
+                time.sleep(entry.get("latency_s", 0.0) / self.speed)
+            return entry["response"]
+
+        t0 = time.perf_counter()
+        response = live()
+        self._put(key, model, prompt, {"response": response, "latency_s": round(time.perf_counter() - t0, 4)})
+        return response
+
+
+def from_env(default_path: str = DEFAULT_PATH) -> Optional[Cassette]:
+    mode = (os.environ.get("LLM_CASSETTE_MODE") or "live").strip().lower()
+    if mode == "live":
+        return None
+    path = os.environ.get("LLM_CASSETTE") or default_path
+    speed = float(os.environ.get("LLM_CASSETTE_SPEED") or 1.0)
+    return Cassette(path, mode=mode, speed=speed)
@@ -1,14 +1,29 @@
 import json
 import asyncio
 import re
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator, List, Optional
 
 import httpx
-from fastapi import FastAPI, Body, UploadFile, File
+from fastapi import FastAPI, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse
 
-app = FastAPI()
+import audio_ingest
+import llm_cassette
+from sse_stream import CONNECTED_EVENT, DONE_EVENT, HEARTBEAT, SSEStream
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load whisper in the audio workers up front (WHISPER_WARMUP=0 skips it)
+    if audio_ingest.WHISPER_WARMUP:
+        audio_ingest.warm_up()
+    yield
+    audio_ingest.shutdown_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # =======================
 # CORS
@@ -31,6 +46,9 @@ app.add_middleware(
 OLLAMA_GENERATE_URL = "http://127.0.0.1:11434/api/generate"
 MODEL_NAME = "qwen2.5:7b-instruct"
 
+# record/playback of Ollama calls (see llm_cassette.py); None = live Ollama
+CASSETTE = llm_cassette.from_env()
+
 # =======================
 # Helpers
 # =======================
@@ -195,6 +213,17 @@ def _extract_json_object(raw: str) -> Optional[dict]:
 
 
 async def ollama_generate_full(prompt: str, timeout_s: int = 120, force_json: bool = False) -> str:
+    if CASSETTE is not None:
+        return await CASSETTE.generate_full(
+            MODEL_NAME,
+            prompt,
+            lambda: _ollama_generate_full(prompt, timeout_s, force_json),
+            force_json=force_json,
+        )
+    return await _ollama_generate_full(prompt, timeout_s, force_json)
+
+
+async def _ollama_generate_full(prompt: str, timeout_s: int, force_json: bool) -> str:
     async with httpx.AsyncClient(timeout=timeout_s) as client:
         payload = {
             "model": MODEL_NAME,
@@ -220,6 +249,15 @@ async def ollama_stream(prompt: str, timeout_s: int = 120) -> AsyncGenerator[str
     Streaming chunks from Ollama (each line is JSON).
     Yields token chunks as strings.
     """
+    if CASSETTE is not None:
+        source = CASSETTE.stream(MODEL_NAME, prompt, lambda: _ollama_stream(prompt, timeout_s))
+    else:
+        source = _ollama_stream(prompt, timeout_s)
+    async for chunk in source:
+        yield chunk
+
+
+async def _ollama_stream(prompt: str, timeout_s: int) -> AsyncGenerator[str, None]:
     async with httpx.AsyncClient(timeout=timeout_s) as client:
         async with client.stream(
             "POST",
@@ -250,14 +288,6 @@ async def ollama_stream(prompt: str, timeout_s: int = 120) -> AsyncGenerator[str
                     break
 
 
-def sse(event: str, data_obj) -> str:
-    if isinstance(data_obj, str):
-        data = data_obj
-    else:
-        data = json.dumps(data_obj, ensure_ascii=False)
-    return f"event: {event}\ndata: {data}\n\n"
-
-
 # =======================
 # Suggested Questions - TRUE Live SSE
 # =======================
@@ -309,20 +339,11 @@ async def suggest_questions_live_stream(payload: dict = Body(...)):
 {text}
 """.strip()
 
-    async def event_gen() -> AsyncGenerator[str, None]:
+    async def event_gen() -> AsyncGenerator[bytes, None]:
         # important headers for proxies/buffers:
-        # (FastAPI/uvicorn usually ok, but keep pings frequent)
-        yield sse("ping", {"stage": "connected"})
-
-        queue: asyncio.Queue = asyncio.Queue()
-
-        async def pinger():
-            try:
-                while True:
-                    await asyncio.sleep(2)
-                    await queue.put(("ping", {}))
-            except asyncio.CancelledError:
-                return
+        # (FastAPI/uvicorn usually ok, but keep pings frequent -> shared HEARTBEAT)
+        stream = SSEStream(HEARTBEAT)
+        stream.push(CONNECTED_EVENT)
 
         async def producer():
             """
@@ -349,7 +370,7 @@ async def suggest_questions_live_stream(payload: dict = Body(...)):
                             continue
 
                         emitted.append(qq)
-                        await queue.put(("q", {"q": qq, "language": patient_lang}))
+                        stream.send("q", {"q": qq, "language": patient_lang})
 
                     if len(emitted) >= max_questions:
                         break
@@ -360,28 +381,23 @@ async def suggest_questions_live_stream(payload: dict = Body(...)):
                             break
                         if qq not in emitted:
                             emitted.append(qq)
-                            await queue.put(("q", {"q": qq, "language": patient_lang}))
+                            stream.send("q", {"q": qq, "language": patient_lang})
 
-                await queue.put(("done", {}))
+                stream.push(DONE_EVENT)
             except Exception as e:
-                await queue.put(("error", {"error": str(e)}))
+                stream.send("error", {"error": str(e)})
+            finally:
+                stream.close()
 
-        ping_task = asyncio.create_task(pinger())
         prod_task = asyncio.create_task(producer())
 
         try:
-            while True:
-                ev, data = await queue.get()
-                yield sse(ev, data)
-                if ev in ("done", "error"):
-                    break
+            # several ready events (e.g. q + q + done) go out as one write
+            async for chunk in stream:
+                yield chunk
         finally:
-            ping_task.cancel()
+            stream.close()
             prod_task.cancel()
-            try:
-                await ping_task
-            except:
-                pass
             try:
                 await prod_task
             except:
@@ -497,19 +513,37 @@ Conversation:
 
 
 # =======================
-# Analyze Audio (placeholder)
+# Analyze Audio (transcript only for now)
 # =======================
+def _audio_result(transcript: str = "", error: Optional[str] = None) -> dict:
+    out = {
+        "transcript": transcript,
+        "suggested_questions": [],
+        "differential_diagnosis": [],
+        "soap_notes": {"subjective": "", "objective": "", "assessment": "", "plan": ""},
+        "prescription": [],
+    }
+    if error:
+        out["error"] = error
+    return out
+
+
 @app.post("/analyze-audio")
-async def analyze_audio(file: UploadFile = File(...)):
-    return JSONResponse(
-        {
-            "transcript": "(audio received) — wire Whisper here",
-            "suggested_questions": [],
-            "differential_diagnosis": [],
-            "soap_notes": {"subjective": "", "objective": "", "assessment": "", "plan": ""},
-            "prescription": [],
-        }
-    )
+async def analyze_audio(request: Request):
+    # multipart "file" field, read from the request stream by audio_ingest
+    # (not UploadFile: that buffers the whole body before we can check limits)
+    try:
+        audio = await audio_ingest.ingest_request(request)
+    except audio_ingest.AudioRejected as e:
+        return JSONResponse(_audio_result(error=str(e)), status_code=200)
+
+    try:
+        transcript = await audio_ingest.transcribe(audio)
+        return JSONResponse(_audio_result(transcript))
+    except Exception as e:
+        return JSONResponse(_audio_result(error=str(e)), status_code=200)
+    finally:
+        audio.cleanup()
 
 
 # =======================
@@ -0,0 +1,498 @@
+"""
+Replay recorded visits through the backend to regression-test speed and output quality.
+
+Feeds saved transcripts through /suggest-questions-live-stream and /analyze the
+same way the React app does while listening (growing text, 900ms suggestion
+tick on the last two sentences with in-flight guard and anti-spam throttle,
+mid-analyze debounced 1.2s and at most every 10s with in-flight guard, final
+analyze on stop), with word timing that imitates real speech: a steady --wpm
+plus a 1.5s pause after each sentence or line.
+
+Visits whose transcript is too short for the final analyze (App.js skips it)
+are reported as "not compared" rather than as a match.
+
+Usage (from backend/):
+    python replay_visits.py                      # all saved_visit_*.json + AI Engine transcripts, fake LLM
+    python replay_visits.py --llm live           # real Ollama
+    python replay_visits.py --llm record         # real Ollama, saved to llm_cassette.json
+    python replay_visits.py --llm playback       # deterministic replay of llm_cassette.json
+    python replay_visits.py --speed 20 --json report.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_ENGINE_DIR = os.path.join(BACKEND_DIR, "..", "AI Engine", "AI_Medical_Assistant")
+sys.path.insert(0, BACKEND_DIR)
+
+import llm_cassette  # noqa: E402
+import main  # noqa: E402
+
+# same cadence as src/App.js
+SUGGEST_TICK_S = 0.9
+SUGGEST_MIN_CHARS = 15
+SUGGEST_SNIPPET_CHARS = 240
+SUGGEST_MIN_SNIPPET_CHARS = 10
+SUGGEST_MAX_SHOWN = 3
+SUGGEST_SPAM_WINDOW_S = 1.8
+LIVE_ANALYZE_EVERY_S = 10.0
+LIVE_ANALYZE_MIN_CHARS = 80
+LIVE_ANALYZE_CHARS = 1800
+LIVE_ANALYZE_KEY_CHARS = 700
+LIVE_ANALYZE_DEBOUNCE_S = 1.2
+FINAL_ANALYZE_MIN_CHARS = 30
+FINAL_ANALYZE_CHARS = 4000
+
+EMPTY_RESULT = {
+    "differential_diagnosis": [],
+    "soap_notes": {"subjective": "", "objective": "", "assessment": "", "plan": ""},
+    "prescription": [],
+}
+
+
+# =======================
+# Recordings
+# =======================
+def default_recording_paths() -> List[str]:
+    paths = sorted(glob.glob(os.path.join(BACKEND_DIR, "saved_visit_*.json")))
+    for name in ("transcript.json", "demo_medical_transcript.json"):
+        p = os.path.join(AI_ENGINE_DIR, name)
+        if os.path.exists(p):
+            paths.append(p)
+    return paths
+
+
+def load_recording(path: str) -> Dict:
+    """
+    saved_visit_*.json -> transcript + stored analysis
+    transcript.json    -> {"ar": ..., "en": ...} without stored analysis
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if isinstance(data.get("transcript"), str):
+        text = data["transcript"]
+        expected = {k: data.get(k) for k in EMPTY_RESULT}
+    else:
+        text = str(data.get("ar", "") or data.get("text", "") or data.get("en", "") or "")
+        expected = None
+
+    # some transcripts were saved with escaped newlines
+    text = text.replace("\\n", "\n").strip()
+    return {"name": os.path.basename(path), "text": text, "expected": expected}
+
+
+# speakers pause between sentences/turns; long enough for App.js's 1.2s analyze debounce to fire
+SENTENCE_PAUSE_S = 1.5
+
+
+def speech_words(text: str) -> List[str]:
+    return re.findall(r"\S+\s*", text)
+
+
+def speech_schedule(text: str, wpm: float, pause_s: float = SENTENCE_PAUSE_S) -> List[tuple]:
+    """
+    [(seconds into the visit when the word is heard, word)], with a pause after each
+    sentence end or line break.
+    """
+    out = []
+    t = 0.0
+    for w in speech_words(text):
+        t += 60.0 / wpm
+        out.append((t, w))
+        if "\n" in w or re.search(r"[.!?؟؛]\s*$", w):
+            t += pause_s
+    return out
+
+
+# =======================
+# App.js helpers (ported so prompts match production)
+# =======================
+_ARABIC_MARKS = re.compile("[\u064B-\u0652\u0640]")
+_ARABIC_LETTERS = str.maketrans({"إ": "ا", "أ": "ا", "آ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+
+
+def normalize_arabic(s: str) -> str:
+    s = _ARABIC_MARKS.sub("", (s or "").lower()).translate(_ARABIC_LETTERS)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def last_sentences(text: str, max_chars: int = 220) -> str:
+    t = (text or "").strip()
+    if not t:
+        return ""
+    tail = " ".join(re.split(r"[\n\r]+", t[-1200:]))
+    parts = [x.strip() for x in re.split(r"[.!\u061B]+", tail) if x.strip()]
+    return " . ".join(parts[-2:])[-max_chars:].strip()
+
+
+def last_chars(text: str, n: int) -> str:
+    t = text.strip()
+    return t[-n:] if len(t) > n else t
+
+
+# =======================
+# Normalized outputs + diff
+# =======================
+def _norm_str(s) -> str:
+    return re.sub(r"\s+", " ", str(s or "")).strip().lower()
+
+
+def normalize_output(obj: Optional[dict]) -> dict:
+    obj = obj or {}
+    dd = []
+    for item in obj.get("differential_diagnosis") or []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            p = round(float(item.get("probability", 0) or 0), 2)
+        except (TypeError, ValueError):
+            p = 0.0
+        dd.append({"name": _norm_str(item.get("name")), "probability": p})
+    dd.sort(key=lambda x: x["name"])
+
+    soap = obj.get("soap_notes") or {}
+    norm_soap = {k: _norm_str(soap.get(k)) for k in EMPTY_RESULT["soap_notes"]}
+
+    rx = sorted({_norm_str(x) for x in obj.get("prescription") or [] if _norm_str(x)})
+    return {"differential_diagnosis": dd, "soap_notes": norm_soap, "prescription": rx}
+
+
+def diff_outputs(expected: dict, actual: dict) -> List[str]:
+    a = normalize_output(expected)
+    b = normalize_output(actual)
+    out: List[str] = []
+
+    names_a = {x["name"]: x["probability"] for x in a["differential_diagnosis"]}
+    names_b = {x["name"]: x["probability"] for x in b["differential_diagnosis"]}
+    for n in sorted(names_a.keys() - names_b.keys()):
+        out.append(f"differential_diagnosis: missing {n!r}")
+    for n in sorted(names_b.keys() - names_a.keys()):
+        out.append(f"differential_diagnosis: extra {n!r}")
+    for n in sorted(names_a.keys() & names_b.keys()):
+        if names_a[n] != names_b[n]:
+            out.append(f"differential_diagnosis: {n!r} probability {names_a[n]} -> {names_b[n]}")
+
+    for k, v in a["soap_notes"].items():
+        if v != b["soap_notes"][k]:
+            out.append(f"soap_notes.{k}: changed")
+
+    for x in sorted(set(a["prescription"]) - set(b["prescription"])):
+        out.append(f"prescription: missing {x!r}")
+    for x in sorted(set(b["prescription"]) - set(a["prescription"])):
+        out.append(f"prescription: extra {x!r}")
+    return out
+
+
+# =======================
+# LLM backends
+# =======================
+class FakeLLM:
+    """
+    Deterministic stand-in for Ollama.
+    /analyze gets the stored analysis of the visit being replayed,
+    the live stream gets bank questions token by token.
+    """
+
+    def __init__(self, latency_s: float = 0.0, token_delay_s: float = 0.0):
+        self.latency_s = latency_s
+        self.token_delay_s = token_delay_s
+        self.analysis: Optional[dict] = None
+
+    async def generate_full(self, prompt: str, timeout_s: int = 120, force_json: bool = False) -> str:
+        await asyncio.sleep(self.latency_s)
+        return json.dumps(self.analysis or EMPTY_RESULT, ensure_ascii=False)
+
+    async def stream(self, prompt: str, timeout_s: int = 120) -> AsyncGenerator[str, None]:
+        await asyncio.sleep(self.latency_s)
+        text = prompt.split("كلام المريض:", 1)[-1].strip()
+        lang = main.detect_language(text)
+        answer = "\n".join(main.fallback_questions(text, lang, 5))
+        for tok in re.findall(r"\S+\s*", answer):
+            if self.token_delay_s:
+                await asyncio.sleep(self.token_delay_s)
+            yield tok
+
+
+class LLMCounter:
+    """
+    Swaps main.ollama_generate_full / main.ollama_stream and counts calls.
+    """
+
+    def __init__(self, generate_full, stream):
+        self._generate_full = generate_full
+        self._stream = stream
+        self._saved = None
+        self.reset()
+
+    def reset(self):
+        self.generate_calls = 0
+        self.stream_calls = 0
+
+    async def generate_full(self, prompt: str, timeout_s: int = 120, force_json: bool = False) -> str:
+        self.generate_calls += 1
+        return await self._generate_full(prompt, timeout_s=timeout_s, force_json=force_json)
+
+    async def stream(self, prompt: str, timeout_s: int = 120) -> AsyncGenerator[str, None]:
+        self.stream_calls += 1
+        async for chunk in self._stream(prompt, timeout_s=timeout_s):
+            yield chunk
+
+    def __enter__(self):
+        self._saved = (main.ollama_generate_full, main.ollama_stream)
+        main.ollama_generate_full = self.generate_full
+        main.ollama_stream = self.stream
+        return self
+
+    def __exit__(self, *exc):
+        main.ollama_generate_full, main.ollama_stream = self._saved
+        self._saved = None
+
+
+# =======================
+# Replay
+# =======================
+def parse_sse(body: str) -> List[tuple]:
+    events = []
+    for block in body.split("\n\n"):
+        ev, data = "", ""
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                ev = line[7:]
+            elif line.startswith("data: "):
+                data = line[6:]
+        if ev:
+            try:
+                events.append((ev, json.loads(data)))
+            except ValueError:
+                events.append((ev, data))
+    return events
+
+
+async def _timed_post(client: httpx.AsyncClient, url: str, payload: dict) -> tuple:
+    t0 = time.perf_counter()
+    r = await client.post(url, json=payload)
+    return time.perf_counter() - t0, r
+
+
+async def replay_visit(client: httpx.AsyncClient, rec: Dict, wpm: float, speed: float) -> Dict:
+    """
+    Cadence runs on a speech clock (see speech_schedule), so the request schedule is
+    the same at any --speed. With speed > 0 the clock is wall time scaled by speed;
+    with speed 0 each request is awaited before the next word, i.e. the schedule of
+    an app talking to an instant LLM.
+
+    Mid-analyze follows App.js's debounce: it only runs once the transcript has been
+    still for 1.2s, which on the speech clock means during sentence pauses (never
+    right at stop: the app clears the timer and runs the final analyze instead).
+    """
+    suggest_lat: List[float] = []
+    analyze_lat: List[float] = []
+    questions: List[str] = []
+    errors: List[str] = []
+    inflight: List[asyncio.Task] = []
+
+    started = time.perf_counter()
+    spoken_s = 0.0
+
+    def clock() -> float:
+        return (time.perf_counter() - started) * speed if speed > 0 else spoken_s
+
+    # App.js: suggestedLenRef / lastSuggestedAtRef (anti-spam throttle)
+    shown = {"count": 0, "last_at": float("-inf")}
+
+    async def suggest(snippet: str):
+        dt, r = await _timed_post(client, "/suggest-questions-live-stream", {"text": snippet, "max_questions": 2})
+        suggest_lat.append(dt)
+        for ev, data in parse_sse(r.text):
+            if ev == "q":
+                if data["q"] not in questions:
+                    questions.append(data["q"])
+                shown["count"] = min(SUGGEST_MAX_SHOWN, shown["count"] + 1)
+                shown["last_at"] = clock()
+            elif ev == "error":
+                errors.append(str(data.get("error")))
+
+    async def analyze(text: str) -> dict:
+        dt, r = await _timed_post(client, "/analyze", {"ar": text, "en": ""})
+        analyze_lat.append(dt)
+        res = r.json()
+        if res.get("error"):
+            errors.append(res["error"])
+        return res
+
+    async def launch(coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        inflight.append(task)
+        if speed <= 0:
+            await task
+        return task
+
+    async def wait_until(t: float):
+        nonlocal spoken_s
+        spoken_s = t
+        if speed > 0:
+            await asyncio.sleep(max(0.0, started + t / speed - time.perf_counter()))
+
+    text = ""
+    last_sent_key = ""
+    last_analyze_key = ""
+    last_tick = last_analyze = float("-inf")
+    suggest_task: Optional[asyncio.Task] = None
+    analyze_task: Optional[asyncio.Task] = None
+
+    schedule = speech_schedule(rec["text"], wpm)
+    for i, (t_word, w) in enumerate(schedule):
+        text += w
+        await wait_until(t_word)
+        now = clock()
+        full = text.strip()
+
+        # App.js live suggestions tick
+        snippet = last_sentences(full, SUGGEST_SNIPPET_CHARS) if len(full) >= SUGGEST_MIN_CHARS else ""
+        if len(snippet) >= SUGGEST_MIN_SNIPPET_CHARS:
+            key = normalize_arabic(snippet)
+            if key != last_sent_key and now - last_tick >= SUGGEST_TICK_S:
+                last_tick, last_sent_key = now, key
+                throttled = shown["count"] >= SUGGEST_MAX_SHOWN and now - shown["last_at"] < SUGGEST_SPAM_WINDOW_S
+                busy = suggest_task is not None and not suggest_task.done()
+                if not throttled and not busy:
+                    suggest_task = await launch(suggest(snippet))
+
+        # App.js runLiveMidAnalyze, debounced until the text stops changing
+        next_t = schedule[i + 1][0] if i + 1 < len(schedule) else None
+        if next_t is None or next_t - t_word < LIVE_ANALYZE_DEBOUNCE_S:
+            continue
+        await wait_until(t_word + LIVE_ANALYZE_DEBOUNCE_S)
+        now = clock()
+        if len(full) >= LIVE_ANALYZE_MIN_CHARS and now - last_analyze >= LIVE_ANALYZE_EVERY_S:
+            payload_text = full[-LIVE_ANALYZE_CHARS:]
+            key = normalize_arabic(payload_text)[-LIVE_ANALYZE_KEY_CHARS:]
+            busy = analyze_task is not None and not analyze_task.done()
+            if key != last_analyze_key and not busy:
+                last_analyze, last_analyze_key = now, key
+                analyze_task = await launch(analyze(payload_text))
+
+    speech_s = time.perf_counter() - started
+    t_stop = time.perf_counter()
+    final = None
+    if len(text.strip()) >= FINAL_ANALYZE_MIN_CHARS:
+        final = await analyze(last_chars(text, FINAL_ANALYZE_CHARS))
+    final_s = time.perf_counter() - t_stop
+    await asyncio.gather(*inflight)
+
+    return {
+        "visit": rec["name"],
+        "speech_s": round(speech_s, 3),
+        "end_to_end_s": round(time.perf_counter() - started, 3),
+        "final_analyze_s": round(final_s, 3),
+        "suggest_requests": len(suggest_lat),
+        "suggest_p50_s": _pct(suggest_lat, 50),
+        "suggest_max_s": round(max(suggest_lat), 3) if suggest_lat else 0.0,
+        "analyze_requests": len(analyze_lat),
+        "analyze_p50_s": _pct(analyze_lat, 50),
+        "questions": questions,
+        "errors": errors,
+        "final": final,
+    }
+
+
+def _pct(values: List[float], p: int) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(len(s) * p / 100))], 3)
+
+
+async def run(
+    paths: List[str],
+    llm: str,
+    wpm: float,
+    speed: float,
+    fake_latency_s: float,
+    cassette_path: str = llm_cassette.DEFAULT_PATH,
+    llm_speed: float = 1.0,
+) -> List[Dict]:
+    fake = None
+    if llm == "fake":
+        fake = FakeLLM(latency_s=fake_latency_s, token_delay_s=fake_latency_s / 20)
+        counter = LLMCounter(fake.generate_full, fake.stream)
+    else:
+        if llm in ("record", "playback"):
+            main.CASSETTE = llm_cassette.Cassette(cassette_path, mode=llm, speed=llm_speed)
+        counter = LLMCounter(main.ollama_generate_full, main.ollama_stream)
+
+    reports: List[Dict] = []
+    transport = httpx.ASGITransport(app=main.app)
+    with counter:
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=600) as client:
+            for path in paths:
+                rec = load_recording(path)
+                if fake:
+                    fake.analysis = rec["expected"]
+                counter.reset()
+
+                rep = await replay_visit(client, rec, wpm, speed)
+                rep["llm_calls"] = counter.generate_calls + counter.stream_calls
+                rep["llm_generate_calls"] = counter.generate_calls
+                rep["llm_stream_calls"] = counter.stream_calls
+                rep["compared"] = bool(rec["expected"] and rep["final"])
+                rep["diff"] = diff_outputs(rec["expected"], rep["final"]) if rep["compared"] else []
+                reports.append(rep)
+    if main.CASSETTE is not None and main.CASSETTE.mode == "record":
+        main.CASSETTE.save()
+    return reports
+
+
+def print_report(reports: List[Dict]):
+    cols = ("visit", "end_to_end_s", "final_analyze_s", "suggest_p50_s", "analyze_p50_s", "llm_calls", "diff")
+    print(" | ".join(cols))
+    for r in reports:
+        row = [str(r[c]) for c in cols[:-1]]
+        row.append(str(len(r["diff"])) if r["compared"] else "not compared")
+        print(" | ".join(row))
+        for d in r["diff"]:
+            print(f"    - {d}")
+        for e in r["errors"]:
+            print(f"    ! {e}")
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Replay recorded visits through /analyze and the live suggestion stream.")
+    ap.add_argument("paths", nargs="*", help="visit/transcript JSON files (default: all known recordings)")
+    ap.add_argument("--llm", choices=["fake", "live", "record", "playback"], default="fake")
+    ap.add_argument("--cassette", default=os.path.join(BACKEND_DIR, llm_cassette.DEFAULT_PATH),
+                    help="cassette file for --llm record/playback")
+    ap.add_argument("--llm-speed", type=float, default=1.0,
+                    help="playback speed of recorded LLM timing (0 = instant)")
+    ap.add_argument("--wpm", type=float, default=150.0, help="speaking rate used to grow the transcript")
+    ap.add_argument("--speed", type=float, default=1.0,
+                    help="time acceleration factor (0 = no delays, same request schedule)")
+    ap.add_argument("--fake-latency", type=float, default=0.05, help="per-call latency of the fake LLM (seconds)")
+    ap.add_argument("--json", dest="json_out", help="write the full report to this file")
+    args = ap.parse_args(argv)
+
+    paths = args.paths or default_recording_paths()
+    reports = asyncio.run(
+        run(paths, args.llm, args.wpm, args.speed, args.fake_latency, args.cassette, args.llm_speed)
+    )
+    print_report(reports)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+    return 1 if any(r["diff"] or r["errors"] for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
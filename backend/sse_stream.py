@@ -0,0 +1,119 @@
+"""
+Server-Sent Events helpers.
+
+- sse() encodes straight to bytes (orjson when installed)
+- constant events (pings) are pre-encoded once
+- one shared heartbeat task pings every idle stream, instead of a pinger task per request
+- events that are ready together go out as one write
+"""
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Optional, Set
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _dumps(data_obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data_obj)
+    return json.dumps(data_obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse(event: str, data_obj) -> bytes:
+    if isinstance(data_obj, str):
+        data = data_obj.encode("utf-8")
+    elif isinstance(data_obj, bytes):
+        data = data_obj
+    else:
+        data = _dumps(data_obj)
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + data + b"\n\n"
+
+
+PING_EVENT = sse("ping", {})
+CONNECTED_EVENT = sse("ping", {"stage": "connected"})
+DONE_EVENT = sse("done", {})
+
+
+class SSEStream:
+    """
+    Per-request outbox. Producers push() encoded events, the response
+    iterates the stream and gets everything buffered since the last write.
+    """
+
+    __slots__ = ("_buf", "_wake", "_heartbeat", "closed", "last_write")
+
+    def __init__(self, heartbeat: Optional["SSEHeartbeat"] = None):
+        self._buf = []
+        self._wake = asyncio.Event()
+        self._heartbeat = heartbeat
+        self.closed = False
+        self.last_write = time.monotonic()
+        if heartbeat is not None:
+            heartbeat.register(self)
+
+    def push(self, chunk: bytes):
+        if self.closed:
+            return
+        self._buf.append(chunk)
+        self.last_write = time.monotonic()
+        self._wake.set()
+
+    def send(self, event: str, data_obj):
+        self.push(sse(event, data_obj))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._heartbeat is not None:
+            self._heartbeat.unregister(self)
+        self._wake.set()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while True:
+            if not self._buf:
+                if self.closed:
+                    return
+                await self._wake.wait()
+                self._wake.clear()
+                continue
+            out = self._buf[0] if len(self._buf) == 1 else b"".join(self._buf)
+            self._buf.clear()
+            yield out
+
+
+class SSEHeartbeat:
+    """
+    One task for all open streams: any stream idle for `interval` seconds gets a ping.
+    The task only runs while at least one stream is registered.
+    """
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self._streams: Set[SSEStream] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, stream: SSEStream):
+        self._streams.add(stream)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def unregister(self, stream: SSEStream):
+        self._streams.discard(stream)
+
+    async def _run(self):
+        # checked every half interval -> a stream is never silent for more than 1.5 * interval
+        tick = self.interval / 2
+        while self._streams:
+            await asyncio.sleep(tick)
+            cutoff = time.monotonic() - self.interval
+            for s in list(self._streams):
+                if s.last_write <= cutoff:
+                    s.push(PING_EVENT)
+
+
+HEARTBEAT = SSEHeartbeat()
@@ -1,18 +1,79 @@
+"""
+Whisper transcription.
+
+    python whisper_runner.py audio.mp3      # one file, prints the transcript
+    python whisper_runner.py --daemon       # keep the model loaded, read jobs from stdin
+
+Daemon protocol (one JSON object per line):
+    in : {"id": 1, "path": "audio.mp3"}
+    out: {"id": 1, "text": "..."}   or   {"id": 1, "error": "..."}
+A {"ready": true} line is written once the model is loaded.
+
+whisper (torch) is imported on first use, not at import time.
+"""
+import json
 import sys
-import whisper
+
+MODEL_SIZE = "base"
+
+_model = None
+
+
+def get_model():
+    global _model
+    if _model is None:
+        import whisper
+
+        _model = whisper.load_model(MODEL_SIZE)
+    return _model
+
+
+def transcribe(audio) -> str:
+    """
+    audio: file path or 16 kHz mono float32 array
+    """
+    result = get_model().transcribe(audio)
+    return (result.get("text") or "").strip()
+
+
+def warm_up() -> bool:
+    get_model()
+    return True
+
+
+def _reply(obj: dict):
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def serve(stdin=None):
+    stdin = stdin or sys.stdin
+    warm_up()
+    _reply({"ready": True})
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        job_id = None
+        try:
+            job = json.loads(line)
+            job_id = job.get("id")
+            _reply({"id": job_id, "text": transcribe(job["path"])})
+        except Exception as e:
+            _reply({"id": job_id, "error": str(e)})
+
 
 def main():
     if len(sys.argv) < 2:
         print("No audio path provided", file=sys.stderr)
         sys.exit(1)
 
-    audio_path = sys.argv[1]
+    if sys.argv[1] == "--daemon":
+        serve()
+        return
 
-    model = whisper.load_model("base")
-    result = model.transcribe(audio_path)
-
-    text = (result.get("text") or "").strip()
-    print(text)
+    audio_path = sys.argv[1]
+    print(transcribe(audio_path))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -598,6 +598,13 @@ export default function App() {
       if (!res.ok) throw new Error("Backend error");
       const result = await res.json();
 
+      // rejected upload (too large / too long / malformed) or transcription failure
+      if (result?.error) {
+        setStatus("idle");
+        showToast(result.error);
+        return;
+      }
+
       setData(result);
       setSuggested((result.suggested_questions || []).slice(0, 3));
       setStatus("ready");